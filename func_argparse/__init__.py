@@ -1,23 +1,44 @@
 import argparse
 import collections
+import contextlib
 import enum
 import functools
-import inspect
 import sys
 import typing
 from argparse import ArgumentParser
 from types import FunctionType, ModuleType
-from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
 AnyCallable = Callable[..., Any]
-_GenericAlias = type(Union[int, str])
+_NoneType = type(None)
+_SIMPLE_TYPES = (int, float, str, bytes)
 Parser = Union[type, Callable[[str], Any]]
 R = typing.TypeVar("R", covariant=True)
 
 COMMAND_KEY = "__command"
 
+if typing.TYPE_CHECKING:
+    # inspect is slow to import, and only needed once we build a parser.
+    import inspect
 
-def main(*fns: AnyCallable, description: str = None, module: ModuleType = None) -> Any:
+
+def main(
+    *fns: AnyCallable,
+    description: Optional[str] = None,
+    module: Optional[ModuleType] = None,
+) -> Any:
     """Parses command line arguments and call the chosen function with them.
 
     Arguments:
@@ -37,11 +58,20 @@ def single_main(fn: Callable[..., R]) -> R:
 def make_single_main(fn: Callable[..., R]) -> Callable[[Sequence[str]], R]:
     """Parses command line arguments and call the given function with them."""
     parser = func_argparser(fn)
-    return _make_main(parser)
+
+    def _main(args: Sequence[str]) -> R:
+        # We already know which function to call.
+        parsed_args = parser.parse_args(args).__dict__
+        del parsed_args[COMMAND_KEY]
+        return fn(**parsed_args)
+
+    return _main
 
 
 def make_main(
-    *fns: AnyCallable, module: ModuleType = None, description: str = None
+    *fns: AnyCallable,
+    module: Optional[ModuleType] = None,
+    description: Optional[str] = None,
 ) -> Callable[[Sequence[str]], Any]:
     """Creates a main method for the given module / list of functions.
 
@@ -58,17 +88,17 @@ def make_main(
     return _make_main(parser)
 
 
-def parse_and_call(parser: ArgumentParser, args: Sequence[str] = None) -> Any:
-    parsed_args = vars(parser.parse_args(args))
+def parse_and_call(parser: ArgumentParser, args: Optional[Sequence[str]] = None) -> Any:
+    parsed_args = parser.parse_args(args).__dict__
     if not parsed_args:
         # Show help for multi argparser receiving no arguments.
         parser.print_help()
         parser.exit()
-    assert COMMAND_KEY in parsed_args, (
+    command = parsed_args.pop(COMMAND_KEY, None)
+    assert command is not None, (
         f"Parser {parser} wasn't generated by func_argparser."
         f" It needs a '{COMMAND_KEY}' key."
     )
-    command = parsed_args.pop(COMMAND_KEY)
     return command(**parsed_args)
 
 
@@ -76,21 +106,35 @@ def _make_main(parser: ArgumentParser) -> Callable[[Sequence[str]], R]:
     return functools.partial(parse_and_call, parser)
 
 
-def resolve_public_fns(module: ModuleType = None) -> List[FunctionType]:
+def resolve_public_fns(module: Optional[ModuleType] = None) -> List[FunctionType]:
     if module is None:
         module = sys.modules["__main__"]
 
     # We only keep FunctionType because argspec works with those.
     # This will exclude builtins and C-funtions.
-    fns = list(
+    name = module.__name__
+    return [
         fn
         for n, fn in vars(module).items()
-        if not n.startswith("_") and isinstance(fn, FunctionType)
-    )
-    return [fn for fn in fns if fn.__module__ == module.__name__]
+        if not n.startswith("_") and type(fn) is FunctionType and fn.__module__ == name
+    ]
 
 
 def get_documentation(fn: AnyCallable) -> List[str]:
+    return list(_get_documentation(fn))
+
+
+def _get_init(fn: AnyCallable) -> Any:
+    # The signature of a class comes from its `__init__`, so use it in cache keys.
+    return fn.__init__ if isinstance(fn, type) else None  # type: ignore[misc]
+
+
+def _get_documentation(fn: AnyCallable) -> Tuple[str, ...]:
+    return _cached_documentation(fn, _get_init(fn))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_documentation(fn: AnyCallable, init: Any) -> Tuple[str, ...]:
     fn_doc = fn.__doc__.split("\n") if fn.__doc__ else []
     init_doc: List[str] = []
     if isinstance(fn, type):
@@ -104,34 +148,67 @@ def get_documentation(fn: AnyCallable) -> List[str]:
             if fn.__init__ != tuple.__init__:  # type: ignore[misc]
                 init_doc = init_docstr.split("\n")
 
-    return [l.strip() for l in init_doc + fn_doc if l.strip()]
+    return tuple(l.strip() for l in init_doc + fn_doc if l.strip())
+
+
+def _getfullargspec(fn: AnyCallable) -> "inspect.FullArgSpec":
+    return _cached_getfullargspec(fn, _get_init(fn))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_getfullargspec(fn: AnyCallable, init: Any) -> "inspect.FullArgSpec":
+    import inspect
+
+    return inspect.getfullargspec(fn)
 
 
 def get_fn_description(fn: AnyCallable) -> Optional[str]:
     """Returns the first line of a function doc string."""
-    doc = get_documentation(fn)
+    doc = _get_documentation(fn)
     return doc[0] if doc else None
 
 
+def _get_arguments_doc(fn: AnyCallable) -> Dict[str, str]:
+    """Finds the lines of the docstring starting with an argument name.
+
+    Returns a dict mapping the arguments to the rest of their line.
+    """
+    arguments = set(_getfullargspec(fn).args)
+    docs: Dict[str, str] = {}
+    for l in _get_documentation(fn):
+        l = l.strip("-* ")
+        if not l:
+            continue
+        # TODO: some arguments may have more than one line of documentation.
+        a = l.split(None, 1)[0].split(":", 1)[0]
+        if a not in arguments or a in docs:
+            continue
+        docs[a] = l[len(a) :].strip(" :")
+        if len(docs) == len(arguments):
+            break
+    return docs
+
+
 def _get_arguments_description(
-    fn: AnyCallable, signature: inspect.FullArgSpec, defaults: Dict[str, Any]
+    fn: AnyCallable,
+    signature: "inspect.FullArgSpec",
+    type_hints: Dict[str, Any],
+    defaults: Dict[str, Any],
 ) -> Dict[str, str]:
     """Returns a description for each argument."""
-    lines = get_documentation(fn)
-    if not lines:
+    if not _get_documentation(fn):
         return {}
     descriptions = {}
-    lines = list(filter(None, (l.strip("-* ") for l in lines)))
+    docs = _get_arguments_doc(fn)
     for a in signature.args:
-        # TODO: some arguments may have more than one line of documentation.
-        doc = next((l[len(a) :].strip(" :") for l in lines if l.startswith(a)), None)
+        doc = docs.get(a)
         default = defaults.get(a)
 
         # Don't show values defaulting to None.
         default_doc = f"(default={default})" if default is not None else None
 
         # Only talk about the --no flag if the default is True
-        if signature.annotations.get(a) == bool and default is True:
+        if type_hints.get(a) is bool and default is True:
             default_doc = f"(default={default}, --no-{a} to disable)"
 
         descriptions[a] = " ".join(filter(None, (doc, default_doc)))
@@ -139,8 +216,71 @@ def _get_arguments_description(
     return descriptions
 
 
+@contextlib.contextmanager
+def _shared_formatter(parser: ArgumentParser) -> Iterator[None]:
+    """Makes the parser reuse the same HelpFormatter while adding arguments.
+
+    argparse creates a new HelpFormatter for each `add_argument`,
+    which is slow, noticeably so since CPython 3.14 checks the terminal colors.
+    """
+    formatter = parser._get_formatter()
+
+    def _get_formatter(*args: Any, **kwargs: Any) -> argparse.HelpFormatter:
+        if args or kwargs:
+            return type(parser)._get_formatter(parser, *args, **kwargs)
+        # Reset the state left by previous usages, eg from `add_subparsers`.
+        formatter._current_indent = 0
+        formatter._level = 0
+        formatter._action_max_length = 0
+        formatter._root_section = formatter._Section(formatter, None)
+        formatter._current_section = formatter._root_section
+        return formatter
+
+    setattr(parser, "_get_formatter", _get_formatter)
+    try:
+        yield
+    finally:
+        delattr(parser, "_get_formatter")
+
+
+class _LazySubParsersAction(argparse._SubParsersAction):  # type: ignore[type-arg]
+    """Subparsers action that only builds the subparser of the chosen command."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._lazy_fns: Dict[str, AnyCallable] = {}
+
+    def add_lazy_parser(self, fn: AnyCallable) -> None:
+        name = fn.__name__
+        assert name not in self._name_parser_map, f"Name of {fn} is already used."
+        # Only register the name for `choices` and the help, the parser
+        # will be created if the command is chosen.
+        self._name_parser_map[name] = None
+        self._lazy_fns[name] = fn
+        help = get_fn_description(fn)
+        self._choices_actions.append(self._ChoicesPseudoAction(name, [], help))
+
+    def __call__(
+        self,
+        parser: ArgumentParser,
+        namespace: argparse.Namespace,
+        values: Any,
+        option_string: Optional[str] = None,
+    ) -> None:
+        name = values[0]
+        fn = self._lazy_fns.pop(name, None)
+        if fn is not None:
+            del self._name_parser_map[name]
+            p = self.add_parser(name, description=get_fn_description(fn))
+            func_argparser(fn, p)
+        super().__call__(parser, namespace, values, option_string)
+
+
 def multi_argparser(
-    *fns: AnyCallable, description: str = None, **parsers: ArgumentParser
+    *fns: AnyCallable,
+    description: Optional[str] = None,
+    lazy: bool = True,
+    **parsers: ArgumentParser,
 ) -> ArgumentParser:
     """Creates an ArgumentParser with one subparser for each given function.
 
@@ -148,6 +288,8 @@ def multi_argparser(
         - fns: functions
         - parsers: already created parser
         - description: description of the full parser
+        - lazy: only build the subparser of the command chosen on the command line.
+            Until then `choices` maps the name of the command to None.
 
     Note:
         `multi_argparser(f)` <=> `multi_argparser(f=func_argparser(f))`
@@ -155,10 +297,13 @@ def multi_argparser(
 
     for fn in fns:
         assert fn.__name__ not in parsers, f"Name of {fn} is already used."
-        parsers[fn.__name__] = func_argparser(fn)
+        if not lazy:
+            parsers[fn.__name__] = func_argparser(fn)
 
     parser = ArgumentParser(description=description, add_help=True)
-    subparsers = parser.add_subparsers()
+    with _shared_formatter(parser):
+        subparsers = parser.add_subparsers(action=_LazySubParsersAction)
+    assert isinstance(subparsers, _LazySubParsersAction)
 
     for name, p in parsers.items():
         # TODO: allow aliases
@@ -167,136 +312,212 @@ def multi_argparser(
         choice_action = subparsers._ChoicesPseudoAction(name, aliases, p.description)
         subparsers._choices_actions.append(choice_action)
 
+    if lazy:
+        for fn in fns:
+            subparsers.add_lazy_parser(fn)
+
     return parser
 
 
 def _is_option_type(t: Any) -> bool:
-    if not isinstance(t, _GenericAlias):
+    if getattr(t, "__origin__", None) is not Union:
         return False
-    return (
-        t.__origin__ == Union
-        and len(t.__args__) == 2
-        and issubclass(t.__args__[1], type(None))
-    )
+    return len(t.__args__) == 2 and t.__args__[1] is _NoneType
 
 
 def _get_list_contained_type(t: Any) -> Optional[Type[Any]]:
-    if not isinstance(t, _GenericAlias):
-        return None
-    if t.__origin__ not in (list, collections.abc.Sequence):
+    if getattr(t, "__origin__", None) not in (list, collections.abc.Sequence):
         return None
     contained = t.__args__[0]
     assert isinstance(contained, type)
     return contained
 
 
-def _parse_enum(enum: enum.EnumMeta, flags: List[str], value: str) -> enum.Enum:
-    members = tuple(enum.__members__)
-    # enum members might be case sensitive.
-    if value in members:
-        return enum[value]
-    if value.upper() in members:
-        return enum[value.upper()]
+def _get_enum_parser(t: enum.EnumMeta) -> Callable[[str], enum.Enum]:
+    members: Dict[str, enum.Enum] = dict(t.__members__)
+    choices = ", ".join(members)
 
-    # Mimick argparse error message for choices.
-    # See https://github.com/python/cpython/blob/3.7/Lib/argparse.py#L2420
-    msg = f"invalid choice: '{value}' (choose from {', '.join(members)})"
-    action = argparse.Action(flags, "")
-    raise argparse.ArgumentError(action, msg)
+    def parse_enum(value: str) -> enum.Enum:
+        # enum members might be case sensitive.
+        member = members.get(value)
+        if member is None:
+            member = members.get(value.upper())
+        if member is not None:
+            return member
 
+        # Mimick argparse error message for choices.
+        # See https://github.com/python/cpython/blob/3.7/Lib/argparse.py#L2420
+        msg = f"invalid choice: '{value}' (choose from {choices})"
+        raise argparse.ArgumentTypeError(msg)
 
-def _parse_union(
-    parsers: List[Parser], union: type, flags: List[str], value: str
-) -> Any:
-    for p in parsers:
-        try:
-            return p(value)
-        except Exception:
+    return parse_enum
+
+
+def _may_be_int(value: str) -> bool:
+    # Conservative: `int(value)` can only succeed if this is True.
+    return value.strip().lstrip("+-").replace("_", "").isdigit()
+
+
+def _get_precheck(t: Parser) -> Optional[Callable[[str], bool]]:
+    """Returns a cheap test rejecting values that can't be parsed as `t`."""
+    if t is int:
+        return _may_be_int
+    if isinstance(t, enum.EnumMeta):
+        members: typing.Mapping[str, enum.Enum] = t.__members__
+
+        def is_enum_member(value: str) -> bool:
+            return value in members or value.upper() in members
+
+        return is_enum_member
+    return None
+
+
+def _get_union_parser(t: Any) -> Parser:
+    if _is_option_type(t):
+        return _get_parser(t.__args__[0])
+    parsers = []
+    for st in t.__args__:
+        if st is _NoneType:
             continue
-    pretty = str(union)[len("typing.") :]
-    msg = f"invalid {pretty} value: '{value}'"
-    action = argparse.Action(flags, "")
-    raise argparse.ArgumentError(action, msg)
+        parsers.append((_get_parser(st), _get_precheck(st)))
+        if st is str:
+            # str accepts everything, the following types will never be used.
+            break
+    pretty = str(t)[len("typing.") :]
+
+    def parse_union(value: str) -> Any:
+        for p, precheck in parsers:
+            # Avoid raising and catching exceptions when we can.
+            if precheck is not None and not precheck(value):
+                continue
+            try:
+                return p(value)
+            except Exception:
+                continue
+        raise argparse.ArgumentTypeError(f"invalid {pretty} value: '{value}'")
 
+    return parse_union
 
-def _get_parser(t: Parser, flags: List[str]) -> Parser:
+
+def _get_list_parser(t: Any) -> Parser:
+    return _get_parser(t.__args__[0])
+
+
+_PARSER_BUILDERS: Dict[Any, Callable[[Any], Parser]] = {
+    Union: _get_union_parser,
+    list: _get_list_parser,
+    collections.abc.Sequence: _get_list_parser,
+}
+
+
+def _get_parser(t: Parser) -> Parser:
+    """Returns a function parsing a command line value into a `t`.
+
+    Parsers don't depend on the argument they are used for:
+    argparse adds the flag name to the `ArgumentTypeError` they raise.
+    So they are shared by all arguments with the same type annotation.
+    """
+    if t in _SIMPLE_TYPES:
+        return t
+    # `Union[int, str] == Union[str, int]`, but the order of the members
+    # changes the parser, so the cache is also keyed on the repr.
+    return _cached_parser(t, repr(t))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_parser(t: Parser, key: str) -> Parser:
     # TODO: this abstraction doesn't hold off, we often need to modify the
     # underlying 'action' to be consistent with the parser.
     # this function should receive a reasonable action and only change the parts
     # needed for this type.
     if isinstance(t, enum.EnumMeta):
-        return functools.partial(_parse_enum, t, flags)
-    if _is_option_type(t):
-        assert isinstance(t, _GenericAlias)
-        return _get_parser(t.__args__[0], flags)
-    if isinstance(t, _GenericAlias) and t.__origin__ is Union:
-        parsers = [
-            _get_parser(st, flags)
-            for st in t.__args__
-            if not issubclass(st, type(None))
-        ]
-        return functools.partial(_parse_union, parsers, t, flags)
-
-    if isinstance(t, type):
-        ct = _get_list_contained_type(t)
-        if ct is not None:
-            return _get_parser(ct, flags)
-
+        return _get_enum_parser(t)
+    builder = _PARSER_BUILDERS.get(getattr(t, "__origin__", None))
+    if builder is not None:
+        return builder(t)
     return t
 
 
-def func_argparser(
-    fn: AnyCallable, parser: Optional[ArgumentParser] = None
-) -> ArgumentParser:
-    """Creates an ArgumentParser for the given function."""
-    if not parser:
-        parser = ArgumentParser(description=get_fn_description(fn))
-    parser.set_defaults(**{COMMAND_KEY: fn})
+def _get_short_flags(args: Sequence[str]) -> Dict[str, str]:
+    """Chooses which arguments get a one letter flag."""
+    # Maps each letter to the argument using it.
+    # One letter arguments are given the short flags.
+    owners = {a: a for a in args if len(a) == 1}
+    # -h is always for help.
+    owners.setdefault("h", "")
+    for a in args:
+        # TODO: Should we leverage upper case to have more one letter flags ?
+        owners.setdefault(a[0], a)
+    return {a: f"-{letter}" for letter, a in owners.items() if a}
+
 
-    spec = inspect.getfullargspec(fn)
+def _get_type_hints(fn: AnyCallable, spec: "inspect.FullArgSpec") -> Dict[str, Any]:
+    """Resolves annotations written as strings, see PEP 563."""
+    if not any(
+        isinstance(t, (str, typing.ForwardRef)) for t in spec.annotations.values()
+    ):
+        return spec.annotations
+    target = fn
+    if isinstance(fn, type) and isinstance(fn.__init__, FunctionType):  # type: ignore[misc]
+        target = fn.__init__  # type: ignore[misc]
+    return typing.get_type_hints(target)
+
+
+class _Argument(NamedTuple):
+    """Parameters of an `ArgumentParser.add_argument` call."""
+
+    flags: Tuple[str, ...]
+    kwargs: Dict[str, Any]
+
+
+def _get_arguments(fn: AnyCallable) -> Tuple[_Argument, ...]:
+    return _cached_arguments(fn, _get_init(fn))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_arguments(fn: AnyCallable, init: Any) -> Tuple[_Argument, ...]:
+    """Computes the arguments of the parser for `fn`.
+
+    ArgumentParser are mutable (see `override`), so we only cache how to build them.
+    """
+    spec = _getfullargspec(fn)
     args = spec.args
     if isinstance(fn, type):
         # Ignore `self` from `__init__` method.
         args = args[1:]
     for a in args:
         assert a in spec.annotations, f"Need a type annotation for argument {a} of {fn}"
+    type_hints = _get_type_hints(fn, spec)
 
     if spec.defaults:
-        defaults = dict(zip(reversed(args), reversed(spec.defaults)))
+        defaults = dict(zip(spec.args[-len(spec.defaults) :], spec.defaults))
     else:
         defaults = {}
-    args_desc = _get_arguments_description(fn, spec, defaults)
+    descriptions = _get_arguments_description(fn, spec, type_hints, defaults)
 
-    # One letter arguments are given the short flags.
-    prefixes: Set[str] = set(a for a in args if len(a) == 1)
-    # -h is always for help.
-    prefixes.add("h")
-    for a, t in spec.annotations.items():
-        if a == "return":
-            continue
-        doc = args_desc.get(a)
+    annotations = [(a, t) for a, t in type_hints.items() if a != "return"]
+    short_flags = _get_short_flags([a for a, _ in annotations])
+    arguments = []
+    for a, t in annotations:
+        doc = descriptions.get(a)
         # TODO: allow dash in flags instead of underscore
         # TODO: handle position only arguments
         # TODO: handle *args
         # TODO: handle **kwargs
-        flags = [f"--{a}"]
-        if len(a) == 1 or a[0] not in prefixes:
-            # TODO: Should we leverage upper case to have more one letter flags ?
-            flags.insert(0, f"-{a[0]}")
-            prefixes.add(a[0])
+        short_flag = short_flags.get(a)
+        flags = (short_flag, f"--{a}") if short_flag else (f"--{a}",)
 
         if t is bool:
             d = defaults.get(a, False)
-            parser.add_argument(*flags, default=d, action="store_true", help=doc)
+            kwargs = dict(default=d, action="store_true", help=doc)
+            arguments.append(_Argument(flags, kwargs))
             # The --no flags are hidden
-            parser.add_argument(
-                f"--no-{a}", dest=a, action="store_false", help=argparse.SUPPRESS
-            )
+            kwargs = dict(dest=a, action="store_false", help=argparse.SUPPRESS)
+            arguments.append(_Argument((f"--no-{a}",), kwargs))
             continue
 
-        if _is_option_type(t):
-            if a not in defaults:
-                defaults[a] = None
+        if _is_option_type(t) and a not in defaults:
+            defaults[a] = None
 
         action = "store"
         t_contained = _get_list_contained_type(t)
@@ -304,30 +525,45 @@ def func_argparser(
             action = "append"
             t = t_contained
 
-        parser.add_argument(
-            *flags,
-            type=_get_parser(t, flags),
+        required = a not in defaults
+        kwargs = dict(
+            type=_get_parser(t),
             action=action,
-            default=defaults.get(a),
-            required=a not in defaults,
+            default=None if required else defaults[a],
+            required=required,
             help=doc,
         )
+        arguments.append(_Argument(flags, kwargs))
+    return tuple(arguments)
+
+
+def func_argparser(
+    fn: AnyCallable, parser: Optional[ArgumentParser] = None
+) -> ArgumentParser:
+    """Creates an ArgumentParser for the given function."""
+    if not parser:
+        parser = ArgumentParser(description=get_fn_description(fn))
+    parser.set_defaults(**{COMMAND_KEY: fn})
+
+    with _shared_formatter(parser):
+        for flags, kwargs in _get_arguments(fn):
+            parser.add_argument(*flags, **kwargs)
     return parser
 
 
 def override(
     argparser: ArgumentParser,
     name: str,
-    short_name: str = None,
+    short_name: Optional[str] = None,
     # action: str = None,
     # nargs: str = None,
     # aliases: List[str] = None,
     default: Any = None,
-    type: Callable[[str], Any] = None,
-    choices: Sequence[str] = None,
-    required: bool = None,
-    help: str = None,
-    metavar: str = None,
+    type: Optional[Callable[[str], Any]] = None,
+    choices: Optional[Sequence[str]] = None,
+    required: Optional[bool] = None,
+    help: Optional[str] = None,
+    metavar: Optional[str] = None,
 ) -> None:
     # Notes:
     #   - nargs: TODO
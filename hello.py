@@ -1,7 +1,5 @@
 """Say hello or goodbye to the user."""
 
-import func_argparse
-
 
 def hello(user: str, times: int = None):
     """Say hello.
@@ -18,4 +16,6 @@ def bye(user: str, see_you: float = 1.0):
 
 
 if __name__ == "__main__":
+    import func_argparse
+
     func_argparse.main()
@@ -1,24 +1,13 @@
-from pathlib import Path
+import os
 
 from setuptools import setup
 
-with open(Path(__file__).parent / "README.md") as f:
-    long_description = f.read()
+ext_modules = []
+if os.environ.get("FUNC_ARGPARSE_USE_MYPYC") == "1":
+    # Optionally compile the module to a C extension.
+    from mypyc.build import mypycify
 
-setup(
-    name="func_argparse",
-    description="Generate CLI ArgumentParser from a function signature.",
-    long_description=long_description,
-    long_description_content_type="text/markdown",
-    url="https://github.com/gwenzek/func_argparse",
-    version="1.1.1",
-    author="gwenzek",
-    packages=["func_argparse"],
-    license="BSD",
-    install_requires=[],
-    # Mark the package as compatible with types.
-    # https://mypy.readthedocs.io/en/latest/installed_packages.html#making-pep-561-compatible-packages
-    package_data={"func_argparse": ["py.typed"]},
-    zip_safe=False,
-    extras_require={"dev": ["mypy>=0.730", "pytest", "black", "isort"]},
-)
+    ext_modules = mypycify(["func_argparse/__init__.py"])
+
+# Metadata are declared in setup.cfg.
+setup(ext_modules=ext_modules)
@@ -1,3 +1,4 @@
+import argparse
 import enum
 import io
 import sys
@@ -8,6 +9,7 @@ import pytest  # type: ignore[import]
 
 from func_argparse import (
     COMMAND_KEY,
+    _LazySubParsersAction,
     func_argparser,
     make_single_main,
     multi_argparser,
@@ -19,11 +21,13 @@ from func_argparse import (
 def check(parser: ArgumentParser, args: Union[str, Sequence[str]], expected: dict):
     if isinstance(args, str):
         args = args.split()
-    parsed = vars(parser.parse_args(args))
+    # Compare the attributes dict rather than a Namespace built from `expected`:
+    # nothing is copied, and pytest shows a per key diff on failure.
+    parsed = parser.parse_args(args).__dict__
     if COMMAND_KEY not in expected:
         # COMMAND_KEY is set for all parsers.
         # only check it when explicitly required.
-        parsed.pop(COMMAND_KEY)
+        del parsed[COMMAND_KEY]
     assert expected == parsed
 
 
@@ -38,11 +42,28 @@ def check_fail(parser: ArgumentParser, args: Union[str, Sequence[str]], error: s
         sys.stderr = err
 
 
-def test_int_flag():
-    def f(xx: int, yy: int = 1):
-        ...
+# Parsers that aren't modified by the tests are shared.
+# The functions are defined at module level, to keep the same identity.
+def int_fn(xx: int, yy: int = 1):
+    ...
 
-    parser = func_argparser(f)
+
+def bool_fn(xx: bool, yy: bool = True, zz: bool = False):
+    ...
+
+
+@pytest.fixture(scope="module")
+def int_parser() -> ArgumentParser:
+    return func_argparser(int_fn)
+
+
+@pytest.fixture(scope="module")
+def bool_parser() -> ArgumentParser:
+    return func_argparser(bool_fn)
+
+
+def test_int_flag(int_parser: ArgumentParser):
+    parser = int_parser
     check(parser, ["--xx", "1"], dict(xx=1, yy=1))
     check(parser, ["--xx", "1", "--yy", "-3"], dict(xx=1, yy=-3))
     check(parser, ["-x", "1", "-y", "-3"], dict(xx=1, yy=-3))
@@ -60,11 +81,8 @@ def test_return_type():
     check_fail(parser, ["-x", "foo"], "argument -x/--xx: invalid int value: 'foo'")
 
 
-def test_bool_flag():
-    def f(xx: bool, yy: bool = True, zz: bool = False):
-        ...
-
-    parser = func_argparser(f)
+def test_bool_flag(bool_parser: ArgumentParser):
+    parser = bool_parser
     check(parser, [], dict(xx=False, yy=True, zz=False))
     check(parser, ["--xx", "--yy"], dict(xx=True, yy=True, zz=False))
     check(parser, ["--xx", "--yy", "--zz"], dict(xx=True, yy=True, zz=True))
@@ -73,6 +91,10 @@ def test_bool_flag():
     check(parser, ["--no-x", "--no-y", "--no-z"], dict(xx=False, yy=False, zz=False))
     check(parser, ["--no-y"], dict(xx=False, yy=False, zz=False))
 
+    # The --no flags are regular arguments, and are copied to child parsers.
+    child = ArgumentParser(parents=[parser], add_help=False)
+    check(child, ["--no-y"], dict(xx=False, yy=False, zz=False))
+
 
 def test_optional():
     def f(xx: str = None):
@@ -97,6 +119,9 @@ def test_union():
     parser = func_argparser(f)
     check(parser, ["--xx", "3"], dict(xx=3))
     check(parser, ["--x", "3.1"], dict(xx=3.1))
+    check(parser, ["--xx", "-3"], dict(xx=-3))
+    check(parser, ["--xx", "1_000"], dict(xx=1000))
+    check(parser, ["--xx", "1e3"], dict(xx=1000.0))
     check_fail(
         parser,
         ["-x", "foo"],
@@ -111,6 +136,18 @@ def test_union():
     # Union types are tried in the order they are specified
     check(parser, ["--xx", "3"], dict(xx="3"))
 
+    # Same members as above in another order, the parsers must not be shared.
+    def g2(xx: Union[int, str], yy: Union[float, int] = 0):
+        ...
+
+    parser = func_argparser(g2)
+    check(parser, ["--xx", "3"], dict(xx=3, yy=0))
+    check_fail(
+        parser,
+        ["--yy", "foo"],
+        "argument -y/--yy: invalid Union[float, int] value: 'foo'",
+    )
+
     class Color(enum.Enum):
         RED = 1
 
@@ -123,6 +160,31 @@ def test_union():
     check(parser, ["--xx", "foo"], dict(xx="foo"))
 
 
+def test_string_annotations(capsys):
+    def f(xx: "int", yy: "bool" = False, zz: "Optional[str]" = None):
+        ...
+
+    parser = func_argparser(f)
+    check(parser, ["--xx", "1"], dict(xx=1, yy=False, zz=None))
+    check(parser, ["-x", "1", "-y", "-z", "foo"], dict(xx=1, yy=True, zz="foo"))
+
+    def g(yy: "bool" = True):
+        """Awesome documentation.
+
+        yy: use some yy
+        """
+        ...
+
+    func_argparser(g).print_help()
+    out = capsys.readouterr().out
+    assert "use some yy (default=True, --no-yy to disable)" in out
+
+    class Foo(NamedTuple):
+        xx: "int"
+
+    check(func_argparser(Foo), ["--xx", "3"], dict(xx=3))
+
+
 def test_enum():
     class Color(enum.Enum):
         RED = 1
@@ -138,6 +200,17 @@ def test_enum():
     check(parser, ["-c", "blue"], dict(color=Color.BLUE))
     check_fail(parser, ["-c", "xx"], "argument -c/--color: invalid choice: 'xx'")
 
+    def g(colors: List[Color]):
+        ...
+
+    parser = func_argparser(g)
+    check(parser, "-c red -c BLUE", dict(colors=[Color.RED, Color.BLUE]))
+    check_fail(
+        parser,
+        ["-c", "red", "-c", "xx"],
+        "invalid choice: 'xx' (choose from RED, GREEN, BLUE)",
+    )
+
 
 def test_list():
     def f(xx: List[int]):
@@ -165,19 +238,57 @@ def test_list():
 
 
 def test_multi():
-    def f(xx: int, yy: int = 1):
+    def h(xx: Optional[str]):
         ...
 
-    def g(xx: bool, yy: bool = False):
+    parser = multi_argparser(int_fn, bool_fn, h)
+    check(parser, ["int_fn", "--xx", "1"], dict(__command=int_fn, xx=1, yy=1))
+    check(
+        parser,
+        ["bool_fn", "--xx"],
+        dict(__command=bool_fn, xx=True, yy=True, zz=False),
+    )
+    check(parser, ["h", "--xx", "foo"], dict(__command=h, xx="foo"))
+
+
+def test_multi_is_lazy():
+    def f(xx: int):
         ...
 
-    def h(xx: Optional[str]):
+    def g(xx: bool):
         ...
 
-    parser = multi_argparser(f, g, h)
-    check(parser, ["f", "--xx", "1"], dict(__command=f, xx=1, yy=1))
-    check(parser, ["g", "--xx"], dict(__command=g, xx=True, yy=False))
-    check(parser, ["h", "--xx", "foo"], dict(__command=h, xx="foo"))
+    parser = multi_argparser(f, g)
+    check(parser, ["f", "--xx", "1"], dict(__command=f, xx=1))
+    subparsers = parser._subparsers._group_actions[0]  # type: ignore
+    assert isinstance(subparsers, _LazySubParsersAction)
+    # Only the chosen subparser has been built.
+    assert "--xx" in subparsers._name_parser_map["f"]._option_string_actions
+    assert "f" not in subparsers._lazy_fns
+    assert "g" in subparsers._lazy_fns
+    # The subparser is only built once.
+    check(parser, ["f", "--xx", "2"], dict(__command=f, xx=2))
+
+    parser = multi_argparser(f, g, lazy=False)
+    subparsers = parser._subparsers._group_actions[0]  # type: ignore
+    assert isinstance(subparsers, _LazySubParsersAction)
+    assert "--xx" in subparsers._name_parser_map["g"]._option_string_actions
+    check(parser, ["g", "--xx"], dict(__command=g, xx=True))
+
+
+def test_multi_duplicate_name():
+    def f(xx: int):
+        ...
+
+    def make_f():
+        def f(yy: int):
+            ...
+
+        return f
+
+    for lazy in (True, False):
+        with pytest.raises(AssertionError, match="is already used"):
+            multi_argparser(f, make_f(), lazy=lazy)
 
 
 def test_multi_with_override() -> None:
@@ -231,6 +342,7 @@ def test_help(capsys):
         """Awesome documentation.
 
         xx should be an int
+        yyy: not the y coordinate
         yy: the y coordinate
         """
         ...
@@ -238,7 +350,9 @@ def test_help(capsys):
     func_argparser(f).print_help()
     out = capsys.readouterr().out
     assert "Awesome documentation." in out
+    assert "should be an int" in out
     assert "the y coordinate (default=1)" in out
+    assert "not the y coordinate (default=1)" not in out
 
 
 def test_help_bool_flag(capsys):
@@ -255,6 +369,25 @@ def test_help_bool_flag(capsys):
     assert "Awesome documentation." in out
     assert "use some xx (default=False)" in out
     assert "use some yy (default=True, --no-yy to disable)" in out
+    # The --no flags are only mentioned by the hint.
+    assert out.count("--no-") == 1
+
+
+def test_help_uses_current_prog_and_formatter(capsys):
+    def f(xx: int = 1):
+        """Awesome documentation.
+
+        xx: the xx
+        """
+        ...
+
+    parser = func_argparser(f)
+    parser.prog = "mytool"
+    parser.formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    parser.print_help()
+    out = capsys.readouterr().out
+    assert out.startswith("usage: mytool")
+    assert "(default: 1)" in out
 
 
 def test_multi_with_no_command_shows_help(capsys):
@@ -285,6 +418,10 @@ def test_override_required():
     check_fail(parser, [], "the following arguments are required: -y/--yy")
     check(parser, ["--yy", "3"], dict(xx=2, yy=3))
 
+    # Overriding doesn't affect other parsers built for the same function.
+    parser = func_argparser(f)
+    check_fail(parser, ["--yy", "3"], "the following arguments are required: -x/--xx")
+
 
 def test_override_type():
     def f(xx: int = 0xFFF):
@@ -336,6 +473,16 @@ def test_class_parser(capsys):
     # Prefer __init__ documentation over Foo ones
     assert "__init__ documentation" in out
 
+    def __init__(self, xx: int):
+        """New __init__ documentation"""
+        self.xx = xx
+
+    # The documentation follows a new __init__.
+    setattr(Foo, "__init__", __init__)
+    func_argparser(Foo).print_help()
+    out = capsys.readouterr().out
+    assert "New __init__ documentation" in out
+
 
 def test_named_tuple_parser(capsys):
     class Foo(NamedTuple):